@@ -0,0 +1,78 @@
+"""
+Кэш сборки по хэшу содержимого
+Пропускает запись/упаковку, если входные данные не изменились
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+def digest(*parts):
+    """SHA-256 от строк/байтов"""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        h.update(part)
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def file_digest(path, chunk_size=1 << 16):
+    """SHA-256 файла, читается по частям"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BuildCache:
+    """
+    Манифест: путь выходного файла относительно каталога манифеста -> хэш входных данных + (mtime_ns, size) записанного файла.
+    Файл, изменённый на диске после сборки (checkout, ручная правка), считается устаревшим.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            entries = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            entries = {}
+        self.entries = {name: entry for name, entry in entries.items() if isinstance(entry, dict)}
+
+    def name(self, output):
+        """Ключ записи: одноимённые файлы в разных каталогах не пересекаются"""
+        return Path(os.path.relpath(Path(output).resolve(), self.path.resolve().parent)).as_posix()
+
+    @staticmethod
+    def stamp(output):
+        stat = Path(output).stat()
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def fresh(self, output, key):
+        entry = self.entries.get(self.name(output))
+        if not entry or entry.get('key') != key:
+            return False
+        try:
+            return entry.get('stamp') == self.stamp(output)
+        except OSError:
+            return False
+
+    def update(self, output, key):
+        """Вызывать после записи файла"""
+        self.entries[self.name(output)] = {'key': key, 'stamp': self.stamp(output)}
+
+    def write_text(self, output, text):
+        """Записать файл, только если содержимое изменилось. True — если записан"""
+        key = digest(text)
+        if self.fresh(output, key):
+            return False
+        Path(output).write_text(text, encoding='utf-8')
+        self.update(output, key)
+        return True
+
+    def save(self):
+        self.path.write_text(json.dumps(self.entries, ensure_ascii=False, indent=2, sort_keys=True), encoding='utf-8')
@@ -0,0 +1,204 @@
+"""
+Проверка ссылок, якорей и ресурсов сайта "Путь в АД"
+Один индекс файлов и якорей в памяти, все href/src/sitemap проверяются за один проход
+"""
+
+import json
+import os
+import posixpath
+import re
+import sys
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+# Конфигурация
+SITE_DIR = Path(r"C:\Users\PC\road-to-hell")
+SITE_URL = "https://jetmil.github.io/road-to-hell/"
+LINK_CACHE = ".link-cache.json"
+REPORT_FILE = "link-report.json"
+
+# Не часть сайта: исходники, офлайн-издания, служебное
+EXCLUDE_DIRS = {".git", "chapters", "editions", "__pycache__", "jobs", "workflows", "snapshots"}
+
+# Атрибуты со ссылками; content проверяется только для абсолютных URL сайта (og:image и т.п.)
+LINK_ATTRS = {"href", "src", "content"}
+
+
+class PageScanner(HTMLParser):
+    """Собирает id/name-якоря и ссылки одной страницы"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.ids = set()
+        self.duplicates = []
+        self.refs = []
+        self.in_speculation = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if attrs.get("id") in self.ids:
+            self.duplicates.append((self.getpos()[0], attrs["id"]))
+        for anchor in (attrs.get("id"), attrs.get("name") if tag == "a" else None):
+            if anchor:
+                self.ids.add(anchor)
+        for attr in LINK_ATTRS:
+            value = attrs.get(attr)
+            if value and (attr != "content" or value.startswith(SITE_URL)):
+                self.refs.append((self.getpos()[0], attr, value))
+        self.in_speculation = tag == "script" and attrs.get("type") == "speculationrules"
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self.in_speculation = False
+
+    def handle_data(self, data):
+        if not self.in_speculation:
+            return
+        try:
+            rules = json.loads(data)
+        except ValueError:
+            self.refs.append((self.getpos()[0], "speculationrules", "<invalid json>"))
+            return
+        for rule in rules.values():
+            for entry in rule:
+                for url in entry.get("urls", []):
+                    self.refs.append((self.getpos()[0], "speculationrules", url))
+
+
+def scan_html(text):
+    """Разбор HTML-текста: (якоря, ссылки, повторные id)"""
+    scanner = PageScanner()
+    scanner.feed(text)
+    scanner.close()
+    return sorted(scanner.ids), scanner.refs, scanner.duplicates
+
+
+def scan_page(path):
+    """Якоря, ссылки и повторные id из HTML, sitemap.xml или robots.txt"""
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".html":
+        return scan_html(text)
+    refs = []
+    for line_no, line in enumerate(text.splitlines(), 1):
+        for url in re.findall(r"<loc>\s*(.+?)\s*</loc>|^Sitemap:\s*(\S+)", line):
+            refs.append((line_no, "loc", next(u for u in url if u)))
+    return [], refs, []
+
+
+def build_index(root):
+    """Все файлы сайта: относительный путь -> (mtime_ns, size)"""
+    index = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in EXCLUDE_DIRS and not d.startswith(".")]
+        for name in filenames:
+            full = Path(dirpath) / name
+            stat = full.stat()
+            index[full.relative_to(root).as_posix()] = (stat.st_mtime_ns, stat.st_size)
+    return index
+
+
+def is_page(rel_path):
+    return rel_path.endswith(".html") or rel_path in ("sitemap.xml", "robots.txt")
+
+
+def resolve(page, value):
+    """Ссылка -> (путь в индексе, якорь) или None для внешних ссылок"""
+    if value.startswith(SITE_URL):
+        base, value = "", value[len(SITE_URL):] or "./"
+    else:
+        base = posixpath.dirname(page)
+    parts = urlsplit(value)
+    if parts.scheme or parts.netloc:
+        return None
+    if not parts.path:
+        return page, parts.fragment
+    target = posixpath.normpath(posixpath.join(base, unquote(parts.path)))
+    if parts.path.endswith("/"):
+        target = posixpath.normpath(posixpath.join(target, "index.html"))
+    return target, parts.fragment
+
+
+def check_site(root=SITE_DIR, report_path=None):
+    """
+    Проверить сайт. Разбираются только страницы, изменившиеся с прошлого запуска;
+    ссылки остальных берутся из кэша и заново сверяются с текущим индексом.
+    """
+    started = time.perf_counter()
+    root = Path(root)
+    cache_path = root / LINK_CACHE
+    try:
+        cache = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        cache = {}
+
+    index = build_index(root)
+    pages = {}
+    parsed = 0
+    for rel, stamp in sorted(index.items()):
+        if not is_page(rel):
+            continue
+        cached = cache.get(rel)
+        if cached and cached["stamp"] == list(stamp) and "duplicates" in cached:
+            pages[rel] = cached
+        else:
+            ids, refs, duplicates = scan_page(root / rel)
+            pages[rel] = {"stamp": list(stamp), "ids": ids, "refs": refs, "duplicates": duplicates}
+            parsed += 1
+
+    anchors = {rel: set(page["ids"]) for rel, page in pages.items()}
+    errors = []
+    checked = 0
+    for rel, page in pages.items():
+        for line, anchor in page["duplicates"]:
+            errors.append({"page": rel, "line": line, "attr": "id", "target": anchor, "reason": "duplicate id"})
+        for line, attr, value in page["refs"]:
+            if value.startswith(("data:", "mailto:", "javascript:", "tel:")):
+                continue
+            resolved = resolve(rel, value)
+            if resolved is None:
+                continue
+            checked += 1
+            target, fragment = resolved
+            if target not in index:
+                reason = "missing file"
+            elif fragment and target in anchors and fragment not in anchors[target]:
+                reason = "missing anchor"
+            else:
+                continue
+            errors.append({"page": rel, "line": line, "attr": attr, "target": value, "reason": reason})
+
+    try:
+        cache_path.write_text(json.dumps(pages, ensure_ascii=False), encoding="utf-8")
+    except OSError:
+        pass
+
+    report = {
+        "pages": len(pages),
+        "parsed": parsed,
+        "links": checked,
+        "errors": errors,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    if report_path:
+        Path(report_path).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return report
+
+
+def print_report(report):
+    for error in report["errors"]:
+        print(f'[BROKEN] {error["page"]}:{error["line"]} {error["attr"]}="{error["target"]}" — {error["reason"]}')
+    print(f'Links: {report["links"]} checked in {report["pages"]} pages '
+          f'({report["parsed"]} parsed), {len(report["errors"])} broken, {report["elapsed_ms"]} ms')
+
+
+def main():
+    root = Path(sys.argv[1]) if len(sys.argv) > 1 else SITE_DIR
+    report = check_site(root, root / REPORT_FILE)
+    print_report(report)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Снапшот-проверка вывода генератора "Путь в АД"
+Рендерит все главы и корпус пограничных Markdown-случаев, сравнивает с эталонами
+структурно (теги, атрибуты, текст без учёта пробелов). Эталоны лежат в snapshots/expected,
+который сборка не трогает. --update перезаписывает эталоны.
+"""
+
+import difflib
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+
+import generate_editions
+import generate_web
+from check_links import scan_html
+
+# Конфигурация
+BASE_DIR = Path(__file__).resolve().parent
+CHAPTERS_MD = BASE_DIR / "chapters"
+SNAPSHOTS_DIR = BASE_DIR / "snapshots"
+CORPUS_DIR = SNAPSHOTS_DIR / "corpus"
+EXPECTED_DIR = SNAPSHOTS_DIR / "expected"
+
+# Фазз-корпус: случайные сочетания фрагментов с фиксированным seed
+FUZZ_SEED = 2026
+FUZZ_CASES = 20
+FUZZ_FRAGMENTS = [
+    "## Заголовок {n}",
+    "### Подзаголовок {n}",
+    '> *"Эпиграф {n}"*',
+    "> Цитата {n} с **жирным**",
+    "Абзац {n} с *курсивом*, **жирным** и ***обоими***.",
+    "Строка {n}\nпродолжение абзаца {n}",
+    "- пункт {n}\n- пункт **{n}**\n* пункт *{n}*",
+    "1. шаг {n}\n2. шаг {n}",
+    "| A{n} | B{n} |\n|---|---|\n| **a** | *b* |",
+    "---",
+    "Ключевые слова: АД, катастрофа, распад {n}.",
+    "**Жирная строка {n}:** и текст после",
+    "*незакрытый курсив {n}",
+]
+
+DIFF_LINES = 20
+
+
+class Tokenizer(HTMLParser):
+    """HTML -> плоский список токенов: теги с отсортированными атрибутами и текст без лишних пробелов"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tokens = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs_text = ''.join(f' {k}="{v}"' for k, v in sorted(attrs, key=lambda a: a[0]))
+        self.tokens.append(f'<{tag}{attrs_text}>')
+
+    def handle_endtag(self, tag):
+        self.tokens.append(f'</{tag}>')
+
+    def handle_data(self, data):
+        text = ' '.join(data.split())
+        if text:
+            self.tokens.append(text)
+
+    def handle_comment(self, data):
+        pass
+
+
+def tokenize(html):
+    tokenizer = Tokenizer()
+    tokenizer.feed(html)
+    tokenizer.close()
+    return tokenizer.tokens
+
+
+def structural_diff(expected, actual):
+    """Пустой список, если HTML структурно совпадает; иначе первые строки diff"""
+    expected_tokens, actual_tokens = tokenize(expected), tokenize(actual)
+    if expected_tokens == actual_tokens:
+        return []
+    diff = difflib.unified_diff(expected_tokens, actual_tokens, "expected", "actual", n=2, lineterm="")
+    return list(diff)[:DIFF_LINES]
+
+
+def fuzz_cases():
+    """Детерминированный фазз-корпус: имя -> Markdown"""
+    rng = random.Random(FUZZ_SEED)
+    cases = {}
+    for i in range(FUZZ_CASES):
+        parts = [rng.choice(FUZZ_FRAGMENTS).format(n=j) for j in range(rng.randint(3, 12))]
+        separators = [rng.choice(["\n", "\n\n"]) for _ in parts]
+        cases[f"fuzz-{i:02d}"] = ''.join(p + s for p, s in zip(parts, separators))
+    return cases
+
+
+def render_chapter(index):
+    """Полная страница главы, как её пишет generate_web"""
+    generate_web.CHAPTERS_MD = CHAPTERS_MD
+    chapters = generate_web.CHAPTERS
+    chapter = chapters[index]
+    prev_ch = chapters[index - 1] if index > 0 else None
+    next_ch = chapters[index + 1] if index < len(chapters) - 1 else None
+    return generate_web.generate_chapter_html(generate_web.parse_chapter(chapter), prev_ch, next_ch)
+
+
+def render_markdown(md_text):
+    """Контент из Markdown: конвертация, id заголовков, ленивые секции"""
+    html, _ = generate_web.add_heading_ids(generate_web.md_to_html_content(md_text))
+    return generate_web.wrap_sections(html)
+
+
+def render_print_edition(_):
+    """Все главы одним документом, как в печатном издании (без картинок)"""
+    generate_web.CHAPTERS_MD = CHAPTERS_MD
+    bodies = []
+    for chapter in generate_web.CHAPTERS:
+        parsed = generate_web.parse_chapter(chapter)
+        bodies.append(generate_editions.chapter_body(
+            parsed, generate_web.PART_NAMES, None, id_prefix=f'chapter-{chapter["num"]}-'))
+    return '\n'.join(bodies)
+
+
+def render_case(case):
+    name, kind, payload = case
+    renderers = {"chapter": render_chapter, "markdown": render_markdown, "edition": render_print_edition}
+    return name, kind, renderers[kind](payload)
+
+
+def duplicate_ids(html):
+    _, _, duplicates = scan_html(html)
+    return [f"duplicate id {anchor!r} at line {line}" for line, anchor in duplicates]
+
+
+def collect_cases():
+    cases = [(f'chapter-{ch["num"]}', "chapter", i) for i, ch in enumerate(generate_web.CHAPTERS)]
+    for path in sorted(CORPUS_DIR.glob("*.md")):
+        cases.append((f"corpus-{path.stem}", "markdown", path.read_text(encoding="utf-8")))
+    cases.extend((name, "markdown", md) for name, md in fuzz_cases().items())
+    # Без эталона: проверяется только уникальность id во всём документе
+    cases.append(("edition-print", "edition", None))
+    return cases
+
+
+def check(update=False, workers=None):
+    """Рендер всех случаев параллельно и сравнение с эталонами. Возвращает (провалы, число случаев)"""
+    cases = collect_cases()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rendered = list(pool.map(render_case, cases, chunksize=4))
+
+    EXPECTED_DIR.mkdir(parents=True, exist_ok=True)
+    failures = {}
+    for name, kind, html in rendered:
+        duplicates = duplicate_ids(html)
+        if duplicates:
+            failures[name] = duplicates
+            continue
+        if kind == "edition":
+            continue
+        path = EXPECTED_DIR / f"{name}.html"
+        if update:
+            if not path.exists() or path.read_text(encoding="utf-8") != html:
+                path.write_text(html, encoding="utf-8")
+                print(f"[UPDATED] {name}")
+            continue
+        if not path.exists():
+            failures[name] = ["missing snapshot (run with --update)"]
+            continue
+        diff = structural_diff(path.read_text(encoding="utf-8"), html)
+        if diff:
+            failures[name] = diff
+
+    if update:
+        known = {f"{name}.html" for name, kind, _ in rendered if kind != "edition"}
+        for stale in EXPECTED_DIR.glob("*.html"):
+            if stale.name not in known:
+                stale.unlink()
+                print(f"[REMOVED] {stale.stem}")
+
+    return failures, len(rendered)
+
+
+def main():
+    update = "--update" in sys.argv
+    started = time.perf_counter()
+    failures, total = check(update=update)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    for name, diff in failures.items():
+        print(f"[FAIL] {name}")
+        for line in diff:
+            print(f"    {line}")
+    print(f"Snapshots: {total - len(failures)}/{total} match, {elapsed:.0f} ms")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Shared ComfyUI client for the "Путь в АД" illustration generators.
+Job model (JSONL file), workflow templates and the queue/poll loop used by both entry points.
+"""
+
+import json
+import os
+import random
+import time
+import zlib
+
+import requests
+
+from comfy_metrics import Metrics, history_timings
+
+COMFYUI_URL = "http://127.0.0.1:8190"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+JOBS_FILE = os.path.join(BASE_DIR, "jobs", "chapters.jsonl")
+WORKFLOWS_DIR = os.path.join(BASE_DIR, "workflows")
+
+# Defaults for every job; any of them can be overridden per line in the jobs file
+JOB_DEFAULTS = {
+    "style": "",
+    "width": 1328,
+    "height": 1328,
+    "steps": 4,
+    "seed": "random",
+}
+
+# Disable proxy for local connections
+os.environ['NO_PROXY'] = '127.0.0.1,localhost'
+os.environ['no_proxy'] = '127.0.0.1,localhost'
+
+# Create session without proxy
+session = requests.Session()
+session.trust_env = False
+
+metrics = Metrics()
+
+
+def iter_jobs(path=JOBS_FILE, only=None):
+    """
+    Stream jobs from a JSONL file, one job per line.
+    Required keys: id, title, prompt. Optional: style, width, height, steps, seed.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            job = {**JOB_DEFAULTS, **json.loads(line)}
+            missing = [k for k in ("id", "title", "prompt") if k not in job]
+            if missing:
+                raise ValueError(f"{path}:{line_no}: missing {', '.join(missing)}")
+            if only is not None and job["id"] not in only:
+                continue
+            yield job
+
+
+def job_prompt(job):
+    """Prompt text with the style suffix applied"""
+    if job["style"]:
+        return f'{job["prompt"]}, {job["style"]}'
+    return job["prompt"]
+
+
+def job_seed(job):
+    """
+    Resolve seed policy: an int is used as is, "stable" derives a
+    repeatable seed from the job id, "random" picks a new one each run.
+    """
+    seed = job["seed"]
+    if isinstance(seed, int):
+        return seed
+    if seed == "stable":
+        return zlib.crc32(str(job["id"]).encode("utf-8")) + 1
+    if seed == "random":
+        return random.randint(1, 2**53)
+    raise ValueError(f'Unknown seed policy for job {job["id"]}: {seed!r}')
+
+
+class WorkflowTemplate:
+    """
+    ComfyUI API graph loaded once per run.
+    bindings map job parameters to (node_id, input_name) slots; build() copies
+    only the nodes it touches and shares the rest with the template.
+    """
+
+    def __init__(self, graph, bindings):
+        self.graph = graph
+        self.bindings = bindings
+        self.touched = {node_id for slots in bindings.values() for node_id, _ in slots}
+        for name, slots in bindings.items():
+            for node_id, input_name in slots:
+                if input_name not in graph[node_id]["inputs"]:
+                    raise KeyError(f"Binding {name}: node {node_id} has no input {input_name}")
+
+    @classmethod
+    def load(cls, name, bindings):
+        with open(os.path.join(WORKFLOWS_DIR, name), encoding="utf-8") as f:
+            return cls(json.load(f), bindings)
+
+    def build(self, **params):
+        graph = dict(self.graph)
+        for node_id in self.touched:
+            node = dict(graph[node_id])
+            node["inputs"] = dict(node["inputs"])
+            graph[node_id] = node
+        for name, value in params.items():
+            for node_id, input_name in self.bindings[name]:
+                graph[node_id]["inputs"][input_name] = value
+        return graph
+
+    def build_job(self, job, filename_prefix):
+        return self.build(
+            text=job_prompt(job),
+            seed=job_seed(job),
+            width=job["width"],
+            height=job["height"],
+            steps=job["steps"],
+            filename_prefix=filename_prefix,
+        )
+
+
+def check_connection():
+    """Check that ComfyUI answers"""
+    try:
+        response = session.get(f"{COMFYUI_URL}/system_stats", timeout=5)
+        if response.status_code != 200:
+            print("ERROR: ComfyUI not available!")
+            return False
+        print("ComfyUI: Connected")
+        return True
+    except requests.RequestException as e:
+        metrics.error("connect", e)
+        print(f"ERROR: Cannot connect to ComfyUI! ({e})")
+        return False
+
+
+def queue_prompt(workflow):
+    """Send workflow to ComfyUI queue"""
+    start = time.perf_counter()
+    try:
+        response = session.post(
+            f"{COMFYUI_URL}/prompt",
+            json={"prompt": workflow},
+            timeout=30
+        )
+        metrics.inc("requests_total", endpoint="prompt", status=response.status_code)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            metrics.inc("errors_total", stage="submit", kind=f"http_{response.status_code}")
+            print(f"Error: {response.status_code} - {response.text[:200]}")
+            return None
+    except requests.RequestException as e:
+        metrics.error("submit", e)
+        print(f"Connection error: {e}")
+        return None
+    finally:
+        metrics.observe_stage("submit", time.perf_counter() - start)
+
+
+def get_queue_status():
+    """Check ComfyUI queue status"""
+    try:
+        response = session.get(f"{COMFYUI_URL}/queue", timeout=10)
+        metrics.inc("requests_total", endpoint="queue", status=response.status_code)
+        if response.status_code == 200:
+            return response.json()
+        return None
+    except requests.RequestException as e:
+        metrics.error("queue_status", e)
+        return None
+
+
+def wait_for_completion(prompt_id, timeout=300, submitted_at=None, poll_interval=2):
+    """Wait for generation to complete"""
+    start = time.time()
+    while time.time() - start < timeout:
+        try:
+            metrics.inc("history_polls_total")
+            response = session.get(f"{COMFYUI_URL}/history/{prompt_id}", timeout=10)
+            metrics.inc("requests_total", endpoint="history", status=response.status_code)
+            if response.status_code == 200:
+                history = response.json()
+                if prompt_id in history:
+                    record_completion(history[prompt_id], submitted_at or start)
+                    return history[prompt_id]
+        except (requests.RequestException, ValueError) as e:
+            metrics.error("poll", e)
+        time.sleep(poll_interval)
+        metrics.inc("sleep_seconds_total", poll_interval, reason="poll")
+    metrics.inc("timeouts_total", stage="completion")
+    return None
+
+
+def record_completion(entry, submitted_at):
+    """Record queue wait and GPU execution time from a history entry"""
+    metrics.observe("completion_wait_seconds", time.time() - submitted_at)
+    queue_wait, execution = history_timings(entry, submitted_at)
+    if queue_wait is not None:
+        metrics.observe_stage("queue_wait", queue_wait)
+    if execution is not None:
+        metrics.observe_stage("execution", execution)
+    status = entry.get("status", {}).get("status_str", "unknown")
+    metrics.inc("completed_total", status=status)
+
+
+def throttle(seconds):
+    """Pause between submissions"""
+    time.sleep(seconds)
+    metrics.inc("sleep_seconds_total", seconds, reason="throttle")
+
+
+def report_metrics(path):
+    """Print per-stage summary and dump metrics file"""
+    print("\nMetrics:")
+    print(metrics.summary())
+    try:
+        print(f"Metrics written to: {metrics.dump(path)}")
+    except OSError as e:
+        print(f"Cannot write metrics: {e}")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Lightweight metrics for the ComfyUI image generation scripts.
+Per-stage latency histograms and counters, dumped as Prometheus text or JSON at the end of a run.
+"""
+
+import json
+import time
+
+# Histogram buckets in seconds: from fast HTTP calls up to long GPU jobs
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "buckets": {str(b): c for b, c in zip(self.buckets, self.counts)},
+        }
+
+
+class Metrics:
+    """Registry of counters and histograms for one generation run"""
+
+    def __init__(self, prefix="comfyui"):
+        self.prefix = prefix
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        self.histograms[key].observe(seconds)
+
+    def observe_stage(self, stage, seconds):
+        self.observe("stage_seconds", seconds, stage=stage)
+
+    def error(self, stage, exc):
+        """Count an error, split out timeouts as their own counter"""
+        kind = type(exc).__name__
+        if "Timeout" in kind:
+            self.inc("timeouts_total", stage=stage)
+        self.inc("errors_total", stage=stage, kind=kind)
+
+    def to_json(self):
+        return {
+            "started": self.started,
+            "wall_seconds": round(time.time() - self.started, 3),
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ],
+            "histograms": [
+                {"name": name, "labels": dict(labels), **hist.to_dict()}
+                for (name, labels), hist in sorted(self.histograms.items())
+            ],
+        }
+
+    def to_prometheus(self):
+        lines = []
+        seen = set()
+
+        def header(metric, kind):
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            metric = f"{self.prefix}_{name}"
+            header(metric, "counter")
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+        for (name, labels), hist in sorted(self.histograms.items()):
+            metric = f"{self.prefix}_{name}"
+            header(metric, "histogram")
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f"{metric}_bucket{_format_labels(labels, {'le': bound})} {count}")
+            lines.append(f"{metric}_bucket{_format_labels(labels, {'le': '+Inf'})} {hist.count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {hist.sum:.6f}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {hist.count}")
+
+        metric = f"{self.prefix}_run_wall_seconds"
+        header(metric, "gauge")
+        lines.append(f"{metric} {time.time() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Short per-stage table for the console"""
+        rows = []
+        for (name, labels), hist in sorted(self.histograms.items()):
+            if name != "stage_seconds":
+                continue
+            stage = dict(labels).get("stage", "")
+            avg = hist.sum / hist.count if hist.count else 0.0
+            rows.append(f"    {stage:<12} n={hist.count:<4} total={hist.sum:8.1f}s avg={avg:6.2f}s")
+        for (name, labels), value in sorted(self.counters.items()):
+            label_text = ",".join(f"{k}={v}" for k, v in labels)
+            rows.append(f"    {name}{'[' + label_text + ']' if label_text else ''} = {value}")
+        return "\n".join(rows)
+
+    def dump(self, path):
+        """Write metrics to path: .json gets JSON, anything else Prometheus text"""
+        if str(path).endswith(".json"):
+            text = json.dumps(self.to_json(), ensure_ascii=False, indent=2)
+        else:
+            text = self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+
+def history_timings(entry, submitted_at):
+    """
+    Split ComfyUI history entry into (queue_wait, execution) seconds.
+    Uses execution_start / execution_success|error timestamps (ms since epoch)
+    from entry["status"]["messages"]; returns None for unknown parts.
+    """
+    started = finished = None
+    for message in entry.get("status", {}).get("messages", []):
+        if len(message) < 2 or not isinstance(message[1], dict):
+            continue
+        event, data = message[0], message[1]
+        ts = data.get("timestamp")
+        if ts is None:
+            continue
+        if event == "execution_start":
+            started = ts / 1000.0
+        elif event in ("execution_success", "execution_error", "execution_interrupted"):
+            finished = ts / 1000.0
+
+    queue_wait = max(0.0, started - submitted_at) if started is not None else None
+    execution = max(0.0, finished - started) if started is not None and finished is not None else None
+    return queue_wait, execution
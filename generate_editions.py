@@ -0,0 +1,287 @@
+"""
+Офлайн-издания книги "Путь в АД"
+EPUB 3 и единый HTML для печати из тех же разобранных глав, что и веб-страницы
+"""
+
+import base64
+import html
+import re
+import shutil
+import uuid
+import xml.etree.ElementTree as ET
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from build_cache import digest, file_digest
+
+try:
+    from PIL import Image
+except ImportError:  # без Pillow картинки идут в исходном размере, с предупреждением
+    Image = None
+
+# Конфигурация
+IMAGES_DIR = Path(r"C:\Users\PC\road-to-hell\images")
+EDITIONS_DIR = Path(r"C:\Users\PC\road-to-hell\editions")
+EPUB_FILE = "road-to-hell.epub"
+PRINT_FILE = "road-to-hell.html"
+
+BOOK_TITLE = "Путь в АД"
+BOOK_SUBTITLE = "Полное руководство по потере себя"
+BOOK_AUTHOR = "Денис Даровицкий"
+BOOK_ID = f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, 'https://jetmil.github.io/road-to-hell/')}"
+
+# Картинки для читалок: длинная сторона и качество JPEG
+IMAGE_MAX_SIDE = 1200
+IMAGE_QUALITY = 80
+
+# Стили без эффектов: читалки и печать
+EDITION_CSS = """body { font-family: Georgia, serif; line-height: 1.6; margin: 0 5%; color: #111; }
+h1, h2, h3 { font-family: sans-serif; line-height: 1.2; page-break-after: avoid; }
+.chapter__number { display: block; font-size: 0.8em; text-transform: uppercase; color: #666; }
+.epigraph { font-style: italic; margin: 1em 2em; color: #444; }
+.fracture { border-top: 1px solid #999; margin: 2em 20%; }
+.ember-text { font-weight: bold; }
+blockquote { margin: 1em 2em; font-style: italic; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border: 1px solid #999; padding: 0.3em 0.5em; text-align: left; }
+figure { margin: 1em 0; text-align: center; }
+img { max-width: 100%; height: auto; }
+.chapter { page-break-before: always; }
+@media print { a { color: inherit; text-decoration: none; } }
+"""
+
+
+def prepare_images(paths, cache_dir):
+    """
+    Дедупликация по хэшу содержимого и уменьшение для читалок.
+    Возвращает {исходный путь: {"name", "path", "media_type"}};
+    одинаковые файлы получают одну запись, уменьшенные копии кэшируются в cache_dir.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    if Image is None:
+        print("WARN: Pillow not installed, images not resized (pip install Pillow)")
+    by_digest = {}
+    result = {}
+
+    for src in paths:
+        if not src.exists():
+            print(f"SKIP: {src} not found")
+            continue
+        key = file_digest(src)
+        if key not in by_digest:
+            if Image is None:
+                by_digest[key] = {"name": f"{key[:16]}{src.suffix}", "path": src, "media_type": "image/png"}
+            else:
+                target = cache_dir / f"{key[:16]}-{IMAGE_MAX_SIDE}q{IMAGE_QUALITY}.jpg"
+                if not target.exists():
+                    with Image.open(src) as img:
+                        img = img.convert("RGB")
+                        img.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE))
+                        img.save(target, "JPEG", quality=IMAGE_QUALITY, optimize=True, progressive=True)
+                by_digest[key] = {"name": target.name, "path": target, "media_type": "image/jpeg"}
+        result[src] = by_digest[key]
+
+    return result
+
+
+XML_ENTITIES = {"amp", "lt", "gt", "quot", "apos"}
+
+
+def xml_safe(fragment):
+    """
+    HTML-фрагмент из md_to_html_content -> XHTML: голые & и < экранируются,
+    именованные HTML-сущности (&mdash; и т.п.) заменяются символами
+    """
+    def entity(match):
+        name = match.group(1)
+        if name in XML_ENTITIES or name.startswith('#'):
+            return match.group(0)
+        text = html.unescape(match.group(0))
+        return html.escape(text, quote=False) if text != match.group(0) else f'&amp;{name};'
+
+    fragment = re.sub(r'&(#\d+|#x[0-9a-fA-F]+|\w+);', entity, fragment)
+    fragment = re.sub(r'&(?!(#\d+|#x[0-9a-fA-F]+|\w+);)', '&amp;', fragment)
+    return re.sub(r'<(?![a-zA-Z/!?])', '&lt;', fragment)
+
+
+def chapter_body(chapter, part_names, image_src, id_prefix=''):
+    """
+    Тело главы (XHTML) для EPUB и печатной версии.
+    id_prefix нужен, когда несколько глав в одном документе: id заголовков уникальны только в главе.
+    """
+    title = html.escape(chapter["title"])
+    content = xml_safe(chapter["content"])
+    if id_prefix:
+        content = re.sub(r' id="([^"]+)"', rf' id="{id_prefix}\1"', content)
+    epigraph = f'<div class="epigraph">{xml_safe(chapter["epigraph"])}</div>' if chapter["epigraph"] else ''
+    figure = f'<figure><img src="{image_src}" alt="{title}"/></figure>' if image_src else ''
+    return f'''<section class="chapter" id="chapter-{chapter["num"]}">
+<span class="chapter__number">Часть {chapter["part"]}. {part_names[chapter["part"]]}</span>
+<h1>{title}</h1>
+{epigraph}
+{figure}
+{content}
+</section>'''
+
+
+def xhtml_page(title, body, css_href="style.css"):
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" xml:lang="ru" lang="ru">
+<head>
+<meta charset="UTF-8"/>
+<title>{html.escape(title)}</title>
+<link rel="stylesheet" type="text/css" href="{css_href}"/>
+</head>
+<body>
+{body}
+</body>
+</html>'''
+
+
+def write_epub(chapters, part_names, images, cover, out_path):
+    """Упаковка EPUB 3; картинки копируются в архив потоком"""
+    modified = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    image_items = {item["name"]: item for item in images.values()}
+    cover_item = images.get(cover)
+
+    manifest = [
+        '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>',
+        '<item id="css" href="style.css" media-type="text/css"/>',
+    ]
+    spine = []
+    for chapter in chapters:
+        manifest.append(f'<item id="ch{chapter["num"]}" href="chapter-{chapter["num"]}.xhtml" media-type="application/xhtml+xml"/>')
+        spine.append(f'<itemref idref="ch{chapter["num"]}"/>')
+    for name, item in image_items.items():
+        props = ' properties="cover-image"' if cover_item and item is cover_item else ''
+        manifest.append(f'<item id="img-{Path(name).stem}" href="images/{name}" media-type="{item["media_type"]}"{props}/>')
+
+    opf = f'''<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id" xml:lang="ru">
+<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+<dc:identifier id="book-id">{BOOK_ID}</dc:identifier>
+<dc:title>{BOOK_TITLE}</dc:title>
+<dc:creator>{BOOK_AUTHOR}</dc:creator>
+<dc:language>ru</dc:language>
+<meta property="dcterms:modified">{modified}</meta>
+</metadata>
+<manifest>
+{chr(10).join(manifest)}
+</manifest>
+<spine>
+{chr(10).join(spine)}
+</spine>
+</package>'''
+
+    toc = '\n'.join(
+        f'<li><a href="chapter-{ch["num"]}.xhtml">{ch["num"]}. {html.escape(ch["title"])}</a></li>'
+        for ch in chapters
+    )
+    nav = xhtml_page(BOOK_TITLE, f'<nav epub:type="toc" id="toc">\n<h1>Оглавление</h1>\n<ol>\n{toc}\n</ol>\n</nav>')
+
+    container = '''<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+<rootfiles>
+<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+</rootfiles>
+</container>'''
+
+    # Каждый XHTML-документ проверяется до упаковки: битый документ читалки отвергнут
+    documents = {"OEBPS/nav.xhtml": nav}
+    for chapter in chapters:
+        item = images.get(IMAGES_DIR / f'chapter_{chapter["num"]}.png')
+        image_src = f'images/{item["name"]}' if item else None
+        body = chapter_body(chapter, part_names, image_src)
+        documents[f'OEBPS/chapter-{chapter["num"]}.xhtml'] = xhtml_page(chapter["title"], body)
+    for name, document in documents.items():
+        try:
+            ET.fromstring(document.encode("utf-8"))
+        except ET.ParseError as e:
+            raise ValueError(f"{out_path.name}: {name} is not well-formed XHTML: {e}") from e
+
+    tmp_path = out_path.with_suffix(".tmp")
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        # mimetype — первым и без сжатия
+        zf.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        zf.writestr("META-INF/container.xml", container)
+        zf.writestr("OEBPS/content.opf", opf)
+        zf.writestr("OEBPS/style.css", EDITION_CSS)
+        for name, document in documents.items():
+            zf.writestr(name, document)
+        for name, item in image_items.items():
+            # Картинки уже сжаты — храним без повторного сжатия
+            with open(item["path"], "rb") as src, zf.open(zipfile.ZipInfo(f"OEBPS/images/{name}"), "w") as dst:
+                shutil.copyfileobj(src, dst)
+    tmp_path.replace(out_path)
+
+
+def write_print_html(chapters, part_names, images, out_path):
+    """Единый HTML для печати; картинки встроены как data: URI, запись по главам"""
+    toc = '\n'.join(
+        f'<li><a href="#chapter-{ch["num"]}">{ch["num"]}. {html.escape(ch["title"])}</a></li>'
+        for ch in chapters
+    )
+
+    tmp_path = out_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(f'''<!DOCTYPE html>
+<html lang="ru">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{BOOK_TITLE} — {BOOK_SUBTITLE}</title>
+    <style>
+{EDITION_CSS}    </style>
+</head>
+<body>
+<header>
+<h1>{BOOK_TITLE}</h1>
+<p>{BOOK_SUBTITLE}</p>
+<p>{BOOK_AUTHOR}</p>
+</header>
+<nav>
+<h2>Оглавление</h2>
+<ol>
+{toc}
+</ol>
+</nav>
+''')
+        for chapter in chapters:
+            item = images.get(IMAGES_DIR / f'chapter_{chapter["num"]}.png')
+            image_src = None
+            if item:
+                data = base64.b64encode(Path(item["path"]).read_bytes()).decode("ascii")
+                image_src = f'data:{item["media_type"]};base64,{data}'
+            f.write(chapter_body(chapter, part_names, image_src, id_prefix=f'chapter-{chapter["num"]}-'))
+            f.write('\n')
+        f.write('</body>\n</html>\n')
+    tmp_path.replace(out_path)
+
+
+def build_editions(chapters, part_names, cache):
+    """Собрать EPUB и HTML для печати, если изменились главы, картинки или этот генератор"""
+    EDITIONS_DIR.mkdir(exist_ok=True)
+
+    cover = IMAGES_DIR / "cover.png"
+    sources = [cover] + [IMAGES_DIR / f'chapter_{ch["num"]}.png' for ch in chapters]
+    images = prepare_images(sources, EDITIONS_DIR / ".images")
+
+    key = digest(
+        Path(__file__).read_bytes(),
+        *(f'{ch["num"]}|{ch["title"]}|{ch["part"]}|{ch["epigraph"]}|{ch["content"]}' for ch in chapters),
+        *(f'{src.name}|{item["name"]}' for src, item in images.items()),
+    )
+
+    outputs = (
+        (EDITIONS_DIR / EPUB_FILE, lambda path: write_epub(chapters, part_names, images, cover, path)),
+        (EDITIONS_DIR / PRINT_FILE, lambda path: write_print_html(chapters, part_names, images, path)),
+    )
+    for path, write in outputs:
+        if cache.fresh(path, key):
+            print(f"[OK] {path.name} (unchanged)")
+            continue
+        write(path)
+        cache.update(path, key)
+        print(f"[OK] {path.name}")
@@ -3,14 +3,19 @@
 Конвертирует Markdown главы в HTML с уникальным дизайном
 """
 
+import json
 import os
 import re
 from pathlib import Path
 
+from build_cache import BuildCache
+from check_links import REPORT_FILE, check_site, print_report
+from generate_editions import build_editions
+
 # Конфигурация
 CHAPTERS_MD = Path(r"C:\Users\PC\road-to-hell\chapters")
 CHAPTERS_HTML = Path(r"C:\Users\PC\road-to-hell\web-chapters")
-CHAPTERS_HTML.mkdir(exist_ok=True)
+BUILD_CACHE = Path(r"C:\Users\PC\road-to-hell\.build-cache.json")
 
 # Метаданные глав
 CHAPTERS = [
@@ -31,6 +36,9 @@ CHAPTERS = [
     {"num": "15", "file": "15-filter-not-echo.md", "title": "Фильтр, не эхо-камера", "part": "V"},
 ]
 
+# Ленивая отрисовка: каждая h2-секция в <section> с content-visibility: auto
+LAZY_SECTIONS = True
+
 PART_NAMES = {
     "I": "Механизмы распада",
     "II": "Точки слома",
@@ -153,8 +161,66 @@ def md_to_html_content(md_text):
     return html
 
 
-def generate_chapter_html(chapter, prev_ch, next_ch):
-    """Генерация HTML страницы главы"""
+def strip_tags(html):
+    return re.sub(r'<[^>]+>', '', html)
+
+
+def slugify(text):
+    """Стабильный id из текста заголовка (кириллица сохраняется)"""
+    slug = re.sub(r'[^\w\s-]', '', strip_tags(text).lower())
+    return re.sub(r'[\s_-]+', '-', slug).strip('-') or 'section'
+
+
+def add_heading_ids(html):
+    """Проставляет id у h2/h3; возвращает HTML и список h2 (id, текст) для оглавления главы"""
+    headings = []
+    used = set()
+
+    def add_id(match):
+        tag, attrs, inner = match.groups()
+        base = slugify(inner)
+        slug, n = base, 2
+        while slug in used:
+            slug, n = f'{base}-{n}', n + 1
+        used.add(slug)
+        if tag == 'h2':
+            headings.append((slug, strip_tags(inner)))
+        return f'<{tag} id="{slug}"{attrs}>{inner}</{tag}>'
+
+    html = re.sub(r'<(h[23])([^>]*)>(.*?)</\1>', add_id, html)
+    return html, headings
+
+
+def render_chapter_toc(headings):
+    """Оглавление главы по h2"""
+    if not headings:
+        return ''
+    items = '\n'.join(f'                <li><a href="#{slug}">{text}</a></li>' for slug, text in headings)
+    return f'''<nav class="chapter__toc fade-in" aria-label="Содержание главы">
+            <ol>
+{items}
+            </ol>
+        </nav>'''
+
+
+def wrap_sections(html):
+    """
+    Оборачивает каждую h2-секцию в <section> с content-visibility: auto.
+    contain-intrinsic-size — оценка высоты по объёму текста (18px, ~65 символов в строке).
+    """
+    chunks = re.split(r'(?=<h2[ >])', html)
+    result = [chunks[0]] if chunks[0].strip() else []
+    for chunk in chunks[1:]:
+        height = 200
+        for block in chunk.split('\n\n'):
+            height += (len(strip_tags(block)) // 65 + 1) * 31 + 20
+        height = (height + 49) // 50 * 50
+        result.append(f'<section class="chapter__section" style="contain-intrinsic-size: auto {height}px">\n{chunk.strip()}\n</section>')
+    return '\n\n'.join(part.strip() for part in result)
+
+
+def parse_chapter(chapter):
+    """Разбор главы: эпиграф + HTML-контент. Один раз на сборку для всех форматов"""
 
     md_path = CHAPTERS_MD / chapter["file"]
     if not md_path.exists():
@@ -170,8 +236,18 @@ def generate_chapter_html(chapter, prev_ch, next_ch):
     # Убираем эпиграф из контента (он уже в header)
     content_without_epigraph = re.sub(r'^> \*".+?"\*\n*', '', md_content, flags=re.MULTILINE)
 
-    # Конвертируем контент
-    html_content = md_to_html_content(content_without_epigraph)
+    # Конвертируем контент, проставляем id заголовков
+    html_content, headings = add_heading_ids(md_to_html_content(content_without_epigraph))
+
+    return {**chapter, "epigraph": epigraph, "content": html_content, "headings": headings}
+
+
+def generate_chapter_html(chapter, prev_ch, next_ch):
+    """Генерация HTML страницы главы из разобранной главы (parse_chapter)"""
+
+    epigraph = chapter["epigraph"]
+    html_content = wrap_sections(chapter["content"]) if LAZY_SECTIONS else chapter["content"]
+    chapter_toc = render_chapter_toc(chapter["headings"])
 
     # Навигация
     prev_link = ""
@@ -186,6 +262,19 @@ def generate_chapter_html(chapter, prev_ch, next_ch):
     else:
         next_link = '<a href="../index.html" class="nav-link nav-link--next">Оглавление</a>'
 
+    # Следующая глава — через speculation rules (без них — fetch из effects.js),
+    # её иллюстрация — prefetch, соседи пререндерятся по наведению
+    next_href = f'{next_ch["num"]}.html' if next_ch else '../index.html'
+    prev_href = f'{prev_ch["num"]}.html' if prev_ch else '../index.html'
+    speculation_rules = json.dumps({
+        "prefetch": [{"source": "list", "urls": [next_href], "eagerness": "immediate"}],
+        "prerender": [{"source": "list", "urls": [next_href, prev_href], "eagerness": "moderate"}],
+    })
+    preload = [f'<script type="speculationrules">{speculation_rules}</script>']
+    if next_ch:
+        preload.insert(0, f'<link rel="prefetch" href="../images/chapter_{next_ch["num"]}.png" as="image">')
+    preload_html = '\n    '.join(preload)
+
     html = f'''<!DOCTYPE html>
 <html lang="ru">
 <head>
@@ -197,6 +286,7 @@ def generate_chapter_html(chapter, prev_ch, next_ch):
     <link rel="stylesheet" href="../css/style.css">
     <link rel="stylesheet" href="../css/effects.css">
     <link rel="icon" href="data:image/svg+xml,<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 100 100'><text y='.9em' font-size='90'>🔥</text></svg>">
+    {preload_html}
 </head>
 <body>
     <!-- Background Effects -->
@@ -240,6 +330,8 @@ def generate_chapter_html(chapter, prev_ch, next_ch):
             <img src="../images/chapter_{chapter["num"]}.png" alt="{chapter["title"]}" class="chapter__img" loading="lazy">
         </figure>
 
+        {chapter_toc}
+
         <div class="chapter__content">
             {html_content}
         </div>
@@ -273,24 +365,36 @@ def main():
 
     success = 0
     failed = 0
+    CHAPTERS_HTML.mkdir(exist_ok=True)
+    cache = BuildCache(BUILD_CACHE)
+
+    # Один разбор на все форматы (веб, EPUB, печать)
+    parsed = [parse_chapter(chapter) for chapter in CHAPTERS]
 
     for i, chapter in enumerate(CHAPTERS):
         prev_ch = CHAPTERS[i - 1] if i > 0 else None
         next_ch = CHAPTERS[i + 1] if i < len(CHAPTERS) - 1 else None
 
-        html = generate_chapter_html(chapter, prev_ch, next_ch)
-
-        if html:
+        if parsed[i]:
+            html = generate_chapter_html(parsed[i], prev_ch, next_ch)
             output_path = CHAPTERS_HTML / f'{chapter["num"]}.html'
-            output_path.write_text(html, encoding='utf-8')
-            print(f"[OK] Glava {chapter['num']}: {chapter['title']}")
+            written = cache.write_text(output_path, html)
+            print(f"[OK] Glava {chapter['num']}: {chapter['title']}{'' if written else ' (unchanged)'}")
             success += 1
         else:
             print(f"[ERR] Glava {chapter['num']}: ERROR")
             failed += 1
 
+    build_editions([p for p in parsed if p], PART_NAMES, cache)
+    cache.save()
+
+    # Проверка ссылок, якорей и ресурсов (разбираются только изменённые страницы)
+    site_dir = CHAPTERS_HTML.parent
+    report = check_site(site_dir, site_dir / REPORT_FILE)
+    print_report(report)
+
     print("=" * 50)
-    print(f"Done: {success} success, {failed} errors")
+    print(f"Done: {success} success, {failed} errors, {len(report['errors'])} broken links")
     print(f"Files in: {CHAPTERS_HTML}")
 
 
@@ -8,6 +8,7 @@ document.addEventListener('DOMContentLoaded', () => {
     initGlitchText();
     initSmoothScroll();
     initParallax();
+    initPerfReport();
 });
 
 /* ==========================================
@@ -51,8 +52,8 @@ function initFadeIn() {
         entries.forEach(entry => {
             if (entry.isIntersecting) {
                 entry.target.classList.add('visible');
-                // Optionally unobserve after animation
-                // observer.unobserve(entry.target);
+                // Показанный элемент больше не отслеживаем
+                observer.unobserve(entry.target);
             }
         });
     }, {
@@ -83,9 +84,12 @@ function initGlitchText() {
 function initSmoothScroll() {
     document.querySelectorAll('a[href^="#"]').forEach(anchor => {
         anchor.addEventListener('click', function(e) {
-            e.preventDefault();
-            const target = document.querySelector(this.getAttribute('href'));
+            // getElementById: id из заголовков могут начинаться с цифры
+            const id = decodeURIComponent(this.getAttribute('href').slice(1));
+            const target = id ? document.getElementById(id) : null;
             if (target) {
+                e.preventDefault();
+                history.pushState(null, '', `#${id}`);
                 target.scrollIntoView({
                     behavior: 'smooth',
                     block: 'start'
@@ -117,6 +121,49 @@ function initParallax() {
     window.addEventListener('scroll', updateParallax, { passive: true });
 }
 
+/* ==========================================
+   PERF REPORT — Замер загрузки (?perf в адресе)
+   ========================================== */
+
+function initPerfReport() {
+    if (!new URLSearchParams(location.search).has('perf')) return;
+
+    const perf = { longTasks: 0, blockingTime: 0 };
+
+    try {
+        new PerformanceObserver(list => {
+            list.getEntries().forEach(task => {
+                perf.longTasks++;
+                perf.blockingTime += Math.max(0, task.duration - 50);
+            });
+        }).observe({ type: 'longtask', buffered: true });
+
+        new PerformanceObserver(list => {
+            const entries = list.getEntries();
+            perf.lcp = Math.round(entries[entries.length - 1].startTime);
+        }).observe({ type: 'largest-contentful-paint', buffered: true });
+    } catch (e) {
+        // Браузер не поддерживает эти типы записей
+    }
+
+    window.addEventListener('load', () => {
+        setTimeout(() => {
+            const nav = performance.getEntriesByType('navigation')[0];
+            const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+            console.table({
+                domInteractive: Math.round(nav.domInteractive),
+                domContentLoaded: Math.round(nav.domContentLoadedEventEnd),
+                load: Math.round(nav.loadEventEnd),
+                fcp: fcp ? Math.round(fcp.startTime) : null,
+                lcp: perf.lcp || null,
+                longTasks: perf.longTasks,
+                totalBlockingTime: Math.round(perf.blockingTime),
+                lazySections: document.querySelectorAll('.chapter__section').length
+            });
+        }, 0);
+    });
+}
+
 /* ==========================================
    RANDOM GLITCH — Случайный глитч
    ========================================== */
@@ -217,6 +264,75 @@ function typeText(element, text, speed = 50) {
     type();
 }
 
+/* ==========================================
+   PREFETCH — Предзагрузка следующей страницы
+   ========================================== */
+
+const BURN_FAST = 200;   // мс: страница уже загружена
+const BURN_FULL = 500;   // мс: длительность .burn-out в effects.css
+
+const prefetchedPages = new Map();
+
+function prefetchPage(href) {
+    const url = new URL(href, location.href).href;
+
+    if (!prefetchedPages.has(url)) {
+        const entry = { done: false };
+        entry.promise = fetch(url, { credentials: 'same-origin' })
+            .then(response => response.ok)
+            .catch(() => false)
+            .then(ok => { entry.done = true; return ok; });
+        prefetchedPages.set(url, entry);
+    }
+
+    return prefetchedPages.get(url);
+}
+
+let speculatedUrls = null;
+
+// Страницы, которые уже загружают speculation rules из <head>:
+// свой fetch для них — лишний запрос, навигация его не использует
+function coveredBySpeculation(href) {
+    if (speculatedUrls === null) {
+        speculatedUrls = new Set();
+        if (HTMLScriptElement.supports?.('speculationrules')) {
+            document.querySelectorAll('script[type="speculationrules"]').forEach(script => {
+                try {
+                    Object.values(JSON.parse(script.textContent)).flat().forEach(rule => {
+                        (rule.urls || []).forEach(url => speculatedUrls.add(new URL(url, location.href).href));
+                    });
+                } catch (e) {
+                    // Некорректные правила — браузер их тоже проигнорирует
+                }
+            });
+        }
+    }
+    return speculatedUrls.has(new URL(href, location.href).href);
+}
+
+function isInternalLink(link) {
+    const href = link.getAttribute('href');
+    return href && !href.startsWith('#') && !href.startsWith('http') && !href.startsWith('mailto');
+}
+
+function initPrefetch() {
+    // Следующая глава — в простое, остальные ссылки — при наведении/касании;
+    // страницы из speculation rules браузер загружает сам
+    const next = document.querySelector('.nav-link--next');
+    if (next && isInternalLink(next) && !coveredBySpeculation(next.getAttribute('href'))) {
+        const idle = window.requestIdleCallback || (fn => setTimeout(fn, 1000));
+        idle(() => prefetchPage(next.getAttribute('href')));
+    }
+
+    document.querySelectorAll('a:not([href^="#"])').forEach(link => {
+        if (!isInternalLink(link) || coveredBySpeculation(link.getAttribute('href'))) return;
+        const warm = () => prefetchPage(link.getAttribute('href'));
+        link.addEventListener('pointerenter', warm, { once: true, passive: true });
+        link.addEventListener('touchstart', warm, { once: true, passive: true });
+        link.addEventListener('focus', warm, { once: true });
+    });
+}
+
 /* ==========================================
    PAGE TRANSITION — Переход между страницами
    ========================================== */
@@ -225,21 +341,56 @@ function initPageTransitions() {
     // Add burn-out effect on link click
     document.querySelectorAll('a:not([href^="#"])').forEach(link => {
         link.addEventListener('click', function(e) {
-            const href = this.getAttribute('href');
-            if (!href || href.startsWith('http') || href.startsWith('mailto')) return;
+            if (!isInternalLink(this)) return;
+            if (e.button !== 0 || e.metaKey || e.ctrlKey || e.shiftKey || e.altKey) return;
 
+            const href = this.getAttribute('href');
             e.preventDefault();
+
+            // Страница из speculation rules уже загружена/пререндерена браузером — короткий прогар без ожидания
+            if (coveredBySpeculation(href)) {
+                document.body.style.animationDuration = `${BURN_FAST}ms`;
+                document.body.classList.add('burn-out');
+                setTimeout(() => {
+                    window.location.href = href;
+                }, BURN_FAST);
+                return;
+            }
+
+            // Анимация идёт параллельно с загрузкой; уже загруженная страница — короткий прогар
+            const page = prefetchPage(href);
+            const burn = page.done ? BURN_FAST : BURN_FULL;
+            document.body.style.animationDuration = `${burn}ms`;
             document.body.classList.add('burn-out');
 
-            setTimeout(() => {
+            const wait = ms => new Promise(resolve => setTimeout(resolve, ms));
+            Promise.race([
+                Promise.all([page.promise, wait(BURN_FAST)]),
+                wait(burn)
+            ]).then(() => {
                 window.location.href = href;
-            }, 500);
+            });
         });
     });
 
+    // Возврат из bfcache: страница не должна остаться "сгоревшей"
+    window.addEventListener('pageshow', (e) => {
+        if (e.persisted) {
+            document.body.classList.remove('burn-out');
+            document.body.style.animationDuration = '';
+        }
+    });
+
     // Add burn-in effect on page load
     document.body.classList.add('burn-in');
 }
 
 // Initialize page transitions
 initPageTransitions();
+
+// Пререндеренная страница начинает предзагрузку только после показа
+if (document.prerendering) {
+    document.addEventListener('prerenderingchange', initPrefetch, { once: true });
+} else {
+    initPrefetch();
+}